@@ -4,18 +4,47 @@ import numpy as np
 import asyncio
 from fastapi import FastAPI, UploadFile, File, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
-from openai import OpenAI
+from openai import AsyncOpenAI, RateLimitError, APIConnectionError, InternalServerError
+from aiolimiter import AsyncLimiter
 from dotenv import load_dotenv
 import tiktoken
 from typing import List, Optional
+from collections import Counter, OrderedDict
 import json
+import re
+import codecs
+import base64
 import httpx
+import sqlite3
+import threading
+import time
+import math
+import random
+import atexit
+import logging
+import logging.handlers
+import queue
+import blake3
+import msgpack
 
 # Load environment variables
 load_dotenv()
 
+# Log through a queue so request handlers never block on stream I/O; a background thread does the writes
+logger = logging.getLogger("voicerag")
+logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+logger.propagate = False
+_log_queue = queue.SimpleQueue()
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+_log_listener = logging.handlers.QueueListener(_log_queue, _log_handler)
+logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
 # Initialize FastAPI app
 app = FastAPI(title="Voice RAG API")
 
@@ -28,97 +57,790 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize OpenAI client
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Initialize async OpenAI client (HTTP/2, pooled connections) so requests never block the event loop.
+# Retries are handled by call_openai so they go through the rate limiters.
+aclient = AsyncOpenAI(
+    api_key=os.getenv("OPENAI_API_KEY"),
+    max_retries=0,
+    http_client=httpx.AsyncClient(
+        http2=True,
+        timeout=httpx.Timeout(60.0, connect=5.0),
+        limits=httpx.Limits(max_connections=100)
+    )
+)
+
+# OpenAI rate-limit budgets (requests and tokens per minute) and retry policy
+OPENAI_RPM = int(os.getenv("OPENAI_RPM", "3500"))
+OPENAI_TPM = int(os.getenv("OPENAI_TPM", "1000000"))
+OPENAI_RETRY_MAX_TIME = 60  # seconds
+OPENAI_RETRY_MAX_DELAY = 20  # seconds
+ANSWER_MAX_TOKENS = 200
+
+# Embedding settings
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_DIM = 1536
+EMBEDDING_BATCH_SIZE = 512  # 512 chunks x 500 tokens stays under the per-request token cap
+EMBEDDING_CONCURRENCY = 8
+QUERY_MAX_TOKENS = 8191  # the embedding model's input limit
+
+# cl100k_base is the tokenizer behind text-embedding-3-small; load it once at import
+_ENCODING = tiktoken.get_encoding("cl100k_base")
+
+# Uploads are hashed, decoded and tokenized in shards of this many bytes
+UPLOAD_READ_SIZE = 64 * 1024
+# Text without a safe split point (CJK, minified files) is force-flushed past this many characters
+UPLOAD_MAX_PENDING_CHARS = 1024 * 1024
+# A newline followed by non-whitespace always ends a cl100k_base pre-token
+LINE_BOUNDARY = re.compile(r"\n(?=\S)")
+TOKEN_CACHE_MAX_TOKENS = 4_000_000  # ~16MB of cached token ids
+TOKEN_CACHE_MIN_CHARS = 64  # shorter segments encode faster than they hash
+
+# Splits after sentence-ending punctuation followed by whitespace
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+")
+
+# Local storage
+DATA_DIR = os.getenv("VOICE_RAG_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"))
+EMBED_CACHE_PATH = os.path.join(DATA_DIR, "embed_cache.sqlite3")
+EMBED_CACHE_TTL = 30 * 24 * 60 * 60  # 30 days
+EMBED_CACHE_PURGE_INTERVAL = 60 * 60  # expired rows are swept at most hourly
+DOCUMENTS_DIR = os.path.join(DATA_DIR, "documents")
+MAX_DOCUMENTS_IN_MEMORY = int(os.getenv("VOICE_RAG_MAX_DOCUMENTS", "8"))
+
+# Micro-batching of concurrent queries
+QUERY_BATCH_MAX_SIZE = 64
+QUERY_BATCH_MAX_WAIT = 0.005  # seconds to wait for more queries before dispatching a batch
+
+# FAISS index tuning
+FLAT_MAX_CHUNKS = 1_000  # up to here a brute-force scan beats walking a graph
+IVFPQ_MIN_CHUNKS = 10_000  # below this, the corpus is too small to train IVF/PQ well
+IVFPQ_FACTORY = "OPQ32,IVF256,PQ32x8"
+NPROBE = 16
+HNSW_M = 32
+HNSW_EF_SEARCH = 64
+
+# Hybrid retrieval: BM25 over casefolded words, fused with dense hits by reciprocal rank
+BM25_TERM_PATTERN = re.compile(r"\w+")
+BM25_STOPWORDS = frozenset(
+    "a an and are as at be but by can do does for from had has have how i if in into is it its "
+    "me my no not of on or our so than that the their them then there these they this to was "
+    "we were what when where which who why will with you your".split()
+)
+BM25_K1 = 1.5
+BM25_B = 0.75
+RRF_K = 60
+RETRIEVAL_CANDIDATES_FACTOR = 4  # each retriever returns top_k * this candidates for fusion
+
+# ==================== OPENAI THROTTLING ====================
+rpm_limiter = AsyncLimiter(OPENAI_RPM, 60)
+tpm_limiter = AsyncLimiter(OPENAI_TPM, 60)
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate for rate budgeting (~4 characters per token)."""
+    return len(text) // 4 + 1
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Seconds the server asked us to wait, if it said."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        if "retry-after-ms" in response.headers:
+            return float(response.headers["retry-after-ms"]) / 1000
+        if "retry-after" in response.headers:
+            return float(response.headers["retry-after"])
+    except ValueError:
+        pass
+    return None
+
+async def call_openai(make_request, tokens: int):
+    """Run an OpenAI request within the RPM/TPM budgets.
+    
+    Rate limits and transient failures are retried with full-jitter exponential
+    backoff, honoring Retry-After, for up to OPENAI_RETRY_MAX_TIME seconds.
+    """
+    deadline = time.monotonic() + OPENAI_RETRY_MAX_TIME
+    attempt = 0
+    
+    while True:
+        await rpm_limiter.acquire()
+        await tpm_limiter.acquire(min(tokens, OPENAI_TPM))
+        try:
+            return await make_request()
+        except (RateLimitError, APIConnectionError, InternalServerError) as e:
+            delay = _retry_after(e)
+            if delay is None:
+                delay = random.uniform(0, min(OPENAI_RETRY_MAX_DELAY, 2 ** attempt))
+            attempt += 1
+            if time.monotonic() + delay > deadline:
+                raise
+            logger.warning("openai %s, retrying in %.1fs (attempt %d)", type(e).__name__, delay, attempt)
+            await asyncio.sleep(delay)
+
+# ==================== EMBEDDING CACHE ====================
+class EmbedCache:
+    """Content-addressed SQLite cache of embedding vectors, keyed by BLAKE3(model, text)."""
+    
+    def __init__(self, path: str, ttl: float = EMBED_CACHE_TTL, dim: int = EMBEDDING_DIM):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.ttl = ttl
+        self.dim = dim
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key BLOB PRIMARY KEY, vector BLOB NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._purge_expired()
+    
+    def _purge_expired(self):
+        now = time.time()
+        self._conn.execute("DELETE FROM embeddings WHERE created_at < ?", (now - self.ttl,))
+        self._conn.commit()
+        self._last_purge = now
+    
+    @staticmethod
+    def key(text: str, model: str) -> bytes:
+        return blake3.blake3((model + "\0" + text).encode("utf-8")).digest()
+    
+    def get_many(self, keys: List[bytes]) -> dict:
+        """Return {key: vector} for every key with a fresh cache entry."""
+        found = {}
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE created_at >= ? "
+                    f"AND key IN ({','.join('?' * len(batch))})",
+                    (cutoff, *batch)
+                ).fetchall()
+                for key, vector in rows:
+                    found[key] = np.frombuffer(vector, dtype=np.float32)
+        return found
+    
+    def put_many(self, items: List[tuple]):
+        """Store (key, vector) pairs as raw float32 bytes."""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, created_at) VALUES (?, ?, ?)",
+                [(key, np.asarray(vector, dtype=np.float32).tobytes(), now) for key, vector in items]
+            )
+            if now - self._last_purge >= EMBED_CACHE_PURGE_INTERVAL:
+                # Long-running servers would otherwise only drop expired rows on restart
+                self._purge_expired()
+            else:
+                self._conn.commit()
+    
+    async def get_or_compute_many(self, texts: List[str], model: str, embed_batch):
+        """Embed texts in input order, calling `embed_batch` only for cache misses."""
+        keys = [self.key(text, model) for text in texts]
+        # SQLite calls block, so run them in a worker thread
+        cached = await asyncio.to_thread(self.get_many, keys)
+        
+        embeddings = np.empty((len(texts), self.dim), dtype=np.float32)
+        misses = {}
+        for row, key in enumerate(keys):
+            if key in cached:
+                embeddings[row] = cached[key]
+            else:
+                misses.setdefault(key, []).append(row)
+        
+        if len(misses) == len(texts):
+            # Nothing cached and no duplicates: the computed array is already in input order
+            embeddings = await embed_batch(texts)
+            await asyncio.to_thread(self.put_many, list(zip(keys, embeddings)))
+        elif misses:
+            miss_keys = list(misses)
+            miss_texts = [texts[misses[key][0]] for key in miss_keys]
+            computed = await embed_batch(miss_texts)
+            for key, vector in zip(miss_keys, computed):
+                embeddings[misses[key]] = vector
+            await asyncio.to_thread(self.put_many, list(zip(miss_keys, computed)))
+        
+        return embeddings
+
+embed_cache = EmbedCache(EMBED_CACHE_PATH)
+
+# ==================== TOKEN CACHE ====================
+class TokenCache:
+    """In-memory LRU of token ids keyed by BLAKE3(text), bounded by the total tokens held.
+    
+    Uploads are cut into line-sized segments whose boundaries depend only on
+    content, so boilerplate shared across documents (headers, licences,
+    repeated paragraphs) maps to the same keys.
+    """
+    
+    def __init__(self, encoding, max_tokens: int = TOKEN_CACHE_MAX_TOKENS, min_chars: int = TOKEN_CACHE_MIN_CHARS):
+        self.encoding = encoding
+        self.max_tokens = max_tokens
+        self.min_chars = min_chars
+        self._entries = OrderedDict()
+        self._size = 0
+    
+    def _put(self, key: bytes, tokens: np.ndarray):
+        self._entries[key] = tokens
+        self._size += len(tokens)
+        while self._size > self.max_tokens and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+    
+    def encode_many(self, texts: List[str]) -> List[int]:
+        """Return the concatenated token ids of `texts`, encoding only the misses."""
+        found = {}
+        misses = {}
+        keys = []
+        for text in texts:
+            key = blake3.blake3(text.encode("utf-8")).digest() if len(text) >= self.min_chars else text
+            keys.append(key)
+            if key in found or key in misses:
+                continue
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                found[key] = self._entries[key]
+            else:
+                misses[key] = text
+        
+        for key, text in misses.items():
+            # uint32 keeps entries at 4 bytes per token instead of a Python int object each
+            found[key] = np.asarray(self.encoding.encode(text), dtype=np.uint32)
+            if isinstance(key, bytes):
+                self._put(key, found[key])
+        
+        if not keys:
+            return []
+        return np.concatenate([found[key] for key in keys]).tolist()
 
-# Global state for document storage
-faiss_index = None
-chunks = []
-doc_title = ""
+token_cache = TokenCache(_ENCODING)
 
 # ==================== MODELS ====================
 class QueryRequest(BaseModel):
     query: str
     top_k: Optional[int] = 5
+    doc_ids: Optional[List[str]] = None  # defaults to the most recently uploaded document
 
 class QueryResponse(BaseModel):
     answer: str
     retrieved_chunks: List[dict]
 
 # ==================== DOCUMENT PROCESSING ====================
-def chunk_text(text: str, doc_title: str, min_tokens: int = 300, max_tokens: int = 500, overlap: int = 50):
-    """Chunk text into smaller pieces with token-based splitting."""
-    encoding = tiktoken.encoding_for_model("text-embedding-3-small")
-    tokens = encoding.encode(text)
-    chunks = []
-    chunk_id = 0
-    i = 0
-    
-    while i < len(tokens):
-        end = min(i + max_tokens, len(tokens))
-        chunk_tokens = tokens[i:end]
-        
-        if len(chunk_tokens) < min_tokens and end < len(tokens):
-            i += max_tokens - overlap
-            continue
-        
-        chunk_text = encoding.decode(chunk_tokens)
-        chunks.append({
+def _pretoken_boundary(text: str, start: int = 0) -> int:
+    """Return the last index where `text` can be split without changing its tokenization.
+    
+    In the cl100k_base split pattern a space preceded by a non-space, and the
+    character after a newline that isn't followed by more whitespace, always
+    start a new pre-token, so encoding either side separately yields the same
+    tokens. Only split points at or after `start` are considered, letting
+    callers skip text they have already searched. Returns 0 when there is no
+    such position.
+    """
+    split = text.rfind(" ", start)
+    while split > 0 and text[split - 1].isspace():
+        split = text.rfind(" ", start, split)
+    
+    newline = text.rfind("\n", max(start - 1, 0), len(text) - 1)
+    while newline >= 0 and text[newline + 1].isspace():
+        newline = text.rfind("\n", max(start - 1, 0), newline)
+    return max(split, newline + 1, 0)
+
+def _line_boundaries(text: str, start: int = 0) -> List[int]:
+    """Return every index at or after `start` that begins a new line of non-whitespace.
+    
+    Each one is a split point `_pretoken_boundary` would also accept, and
+    unlike shard offsets they depend only on the text itself.
+    """
+    return [match.end() for match in LINE_BOUNDARY.finditer(text, max(start - 1, 0))]
+
+async def hash_upload(file: UploadFile) -> str:
+    """Hash an upload in shards, then rewind it for reading."""
+    hasher = blake3.blake3()
+    while data := await file.read(UPLOAD_READ_SIZE):
+        hasher.update(data)
+    await file.seek(0)
+    return hasher.hexdigest()
+
+async def tokenize_upload(file: UploadFile):
+    """Decode and tokenize a UTF-8 upload shard by shard, never holding the whole text.
+    
+    Text is encoded line by line through `token_cache`, so repeated lines and
+    boilerplate are only tokenized once. Returns the token ids and the number
+    of characters decoded.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    tokens = []
+    n_chars = 0
+    pending = ""
+    
+    while data := await file.read(UPLOAD_READ_SIZE):
+        text = decoder.decode(data)
+        n_chars += len(text)
+        pending += text
+        # Earlier text had no line boundary, so only search what was just decoded
+        start = len(pending) - len(text)
+        splits = _line_boundaries(pending, start)
+        if not splits:
+            # The current line spans the whole shard; fall back to a split at a space
+            split = _pretoken_boundary(pending, start)
+            if not split and len(pending) > UPLOAD_MAX_PENDING_CHARS:
+                # Keep memory and rescanning bounded; tokens may differ from a
+                # whole-text encode at this one split
+                split = len(pending)
+            splits = [split] if split else []
+        if splits:
+            bounds = [0, *splits]
+            tokens.extend(token_cache.encode_many([pending[a:b] for a, b in zip(bounds, bounds[1:])]))
+            pending = pending[splits[-1]:]
+    
+    pending += decoder.decode(b"", final=True)
+    tokens.extend(token_cache.encode_many([pending]))
+    
+    return tokens, n_chars
+
+def chunk_tokens(tokens: List[int], doc_title: str, min_tokens: int = 300, max_tokens: int = 500, overlap: int = 50):
+    """Chunk token ids into smaller pieces with token-based splitting."""
+    n_tokens = len(tokens)
+    
+    # Sliding windows; short windows are only kept when they reach the end of the text
+    windows = []
+    for start in range(0, n_tokens, max_tokens - overlap):
+        end = min(start + max_tokens, n_tokens)
+        if end - start >= min_tokens or end == n_tokens:
+            windows.append((start, end))
+    
+    texts = _ENCODING.decode_batch([tokens[start:end] for start, end in windows])
+    
+    return [
+        {
             "text": chunk_text,
             "doc_title": doc_title,
             "chunk_id": chunk_id,
-            "token_count": len(chunk_tokens)
-        })
-        chunk_id += 1
-        i += max_tokens - overlap
+            "token_count": end - start
+        }
+        for chunk_id, (chunk_text, (start, end)) in enumerate(zip(texts, windows))
+    ]
+
+async def embed_texts(texts: List[str]):
+    """Embed texts with OpenAI, running batches concurrently."""
+    embeddings = np.empty((len(texts), EMBEDDING_DIM), dtype=np.float32)
+    semaphore = asyncio.Semaphore(EMBEDDING_CONCURRENCY)
+    
+    async def embed_batch(start: int):
+        batch = texts[start:start + EMBEDDING_BATCH_SIZE]
+        async with semaphore:
+            # Ask for base64 so vectors arrive as raw float32 bytes, not JSON float lists
+            response = await call_openai(
+                lambda: aclient.embeddings.create(
+                    model=EMBEDDING_MODEL,
+                    input=batch,
+                    encoding_format="base64"
+                ),
+                tokens=sum(estimate_tokens(text) for text in batch)
+            )
+        # Each batch owns a disjoint row range, so no locking is needed
+        for item in response.data:
+            embeddings[start + item.index] = np.frombuffer(base64.b64decode(item.embedding), dtype=np.float32)
+    
+    await asyncio.gather(*[embed_batch(start) for start in range(0, len(texts), EMBEDDING_BATCH_SIZE)])
     
-    return chunks
+    return embeddings
 
-def create_embeddings(chunks: List[dict]):
-    """Create embeddings for chunks using OpenAI."""
+async def create_embeddings(chunks: List[dict]):
+    """Create embeddings for chunks, reusing cached vectors for repeated text."""
     texts = [chunk["text"] for chunk in chunks]
-    embeddings = []
-    batch_size = 100
-    
-    for i in range(0, len(texts), batch_size):
-        batch = texts[i:i + batch_size]
-        response = client.embeddings.create(
-            model="text-embedding-3-small",
-            input=batch
-        )
-        embeddings.extend([item.embedding for item in response.data])
+    return await embed_cache.get_or_compute_many(texts, EMBEDDING_MODEL, embed_texts)
+
+# ==================== DOCUMENT STORE ====================
+_gpu_resources = None
+# GPU indexes and the StandardGpuResources they share aren't thread-safe; every
+# GPU clone and search holds this lock
+_gpu_lock = threading.Lock()
+
+def to_search_device(index):
+    """Clone an index onto the first GPU when one is present, falling back to the CPU index."""
+    global _gpu_resources
+    
+    if faiss.get_num_gpus() == 0:
+        return index
     
-    return np.array(embeddings, dtype=np.float32)
+    try:
+        with _gpu_lock:
+            if _gpu_resources is None:
+                _gpu_resources = faiss.StandardGpuResources()
+            options = faiss.GpuClonerOptions()
+            options.useFloat16 = True
+            return faiss.index_cpu_to_gpu(_gpu_resources, 0, index, options)
+    except (AttributeError, RuntimeError) as e:
+        # Not every index type has a GPU implementation (e.g. HNSW, flat SQ)
+        logger.info("keeping %s on CPU: %s", type(index).__name__, e)
+        return index
 
-# ==================== RAG FUNCTIONS ====================
-def get_embedding(text: str):
-    """Get embedding for a single text query."""
-    response = client.embeddings.create(
-        model="text-embedding-3-small",
-        input=text
-    )
-    return np.array([response.data[0].embedding], dtype=np.float32)
+def bm25_terms(text: str) -> List[str]:
+    """Split text into casefolded word terms for BM25, dropping stopwords."""
+    return [term for term in BM25_TERM_PATTERN.findall(text.casefold()) if term not in BM25_STOPWORDS]
+
+class BM25Index:
+    """Okapi BM25 over chunks, using the words from `bm25_terms` as terms."""
+    
+    def __init__(self, term_lists: List[List[str]], k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.n_chunks = len(term_lists)
+        lengths = np.array([len(terms) for terms in term_lists], dtype=np.float32)
+        avg_length = lengths.mean() if self.n_chunks else 1.0
+        # Per-chunk length normalisation term of the BM25 denominator
+        self._norm = k1 * (1 - b + b * lengths / max(avg_length, 1.0))
+        
+        postings = {}
+        for chunk_idx, terms in enumerate(term_lists):
+            for term, count in Counter(terms).items():
+                entry = postings.setdefault(term, ([], []))
+                entry[0].append(chunk_idx)
+                entry[1].append(count)
+        
+        self._postings = {}
+        for term, (chunk_ids, counts) in postings.items():
+            df = len(chunk_ids)
+            idf = math.log(1 + (self.n_chunks - df + 0.5) / (df + 0.5))
+            self._postings[term] = (np.array(chunk_ids, dtype=np.int64), np.array(counts, dtype=np.float32), idf)
+    
+    def search(self, query_terms: List[str], top_k: int):
+        """Return up to top_k (chunk index, score) pairs with a positive score, best first."""
+        scores = np.zeros(self.n_chunks, dtype=np.float32)
+        for term in set(query_terms):
+            if term not in self._postings:
+                continue
+            chunk_ids, tf, idf = self._postings[term]
+            scores[chunk_ids] += idf * tf * (self.k1 + 1) / (tf + self._norm[chunk_ids])
+        
+        k = min(top_k, self.n_chunks)
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(idx, float(scores[idx])) for idx in top.tolist() if scores[idx] > 0]
+
+class Document:
+    """A processed document: its FAISS index and the chunks behind each vector.
+    
+    `index` is the CPU index that gets persisted; `search_index` is what queries
+    run against, which is a GPU copy when one is available.
+    """
+    
+    def __init__(self, doc_id: str, title: str, index, chunks: List[dict]):
+        self.doc_id = doc_id
+        self.title = title
+        self.index = index
+        self.search_index = to_search_device(index)
+        self.on_gpu = self.search_index is not index
+        self.chunks = chunks
+        # Built with the document so queries never pay for (or race on) it
+        self.bm25 = BM25Index([bm25_terms(chunk["text"]) for chunk in chunks])
+
+class DocumentStore:
+    """Documents keyed by content hash: an in-memory LRU backed by per-document files on disk."""
+    
+    def __init__(self, root: str, max_in_memory: int = MAX_DOCUMENTS_IN_MEMORY):
+        self.root = root
+        self.max_in_memory = max_in_memory
+        self._loaded = OrderedDict()
+        self._manifest = {"current": None, "documents": {}}
+        self._manifest_path = os.path.join(root, "manifest.json")
+    
+    @property
+    def current_id(self) -> Optional[str]:
+        return self._manifest["current"]
+    
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._manifest["documents"]
+    
+    def _paths(self, doc_id: str):
+        doc_dir = os.path.join(self.root, doc_id)
+        return os.path.join(doc_dir, "index.faiss"), os.path.join(doc_dir, "chunks.msgpack")
+    
+    def _write_manifest(self):
+        os.makedirs(self.root, exist_ok=True)
+        with open(self._manifest_path + ".tmp", "w") as f:
+            json.dump(self._manifest, f)
+        os.replace(self._manifest_path + ".tmp", self._manifest_path)
+    
+    def _remember(self, document: Document):
+        self._loaded[document.doc_id] = document
+        self._loaded.move_to_end(document.doc_id)
+        while len(self._loaded) > self.max_in_memory:
+            self._loaded.popitem(last=False)
+    
+    def load_manifest(self):
+        """Read the list of persisted documents from disk."""
+        if os.path.exists(self._manifest_path):
+            with open(self._manifest_path) as f:
+                self._manifest = json.load(f)
+    
+    def list_documents(self) -> List[dict]:
+        return [
+            {"doc_id": doc_id, **info}
+            for doc_id, info in self._manifest["documents"].items()
+        ]
+    
+    def set_current(self, doc_id: str):
+        self._manifest["current"] = doc_id
+        self._write_manifest()
+    
+    def _load(self, doc_id: str, title: str) -> Document:
+        index_path, chunks_path = self._paths(doc_id)
+        index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        with open(chunks_path, "rb") as f:
+            chunks = msgpack.unpack(f)
+        return Document(doc_id, title, index, chunks)
+    
+    async def get(self, doc_id: str) -> Optional[Document]:
+        """Return a document, memory-mapping it from disk if it isn't loaded."""
+        if doc_id in self._loaded:
+            self._loaded.move_to_end(doc_id)
+            return self._loaded[doc_id]
+        if doc_id not in self:
+            return None
+        
+        # Reading the files, the GPU clone and the BM25 build all block; run them in a worker thread
+        document = await asyncio.to_thread(self._load, doc_id, self._manifest["documents"][doc_id]["title"])
+        if doc_id in self._loaded:
+            # A concurrent request loaded it first; keep a single instance
+            self._loaded.move_to_end(doc_id)
+            return self._loaded[doc_id]
+        self._remember(document)
+        return document
+    
+    def _write_files(self, doc_id: str, index, chunks: List[dict]):
+        index_path, chunks_path = self._paths(doc_id)
+        os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        
+        faiss.write_index(index, index_path + ".tmp")
+        with open(chunks_path + ".tmp", "wb") as f:
+            msgpack.pack(chunks, f)
+        os.replace(index_path + ".tmp", index_path)
+        os.replace(chunks_path + ".tmp", chunks_path)
+    
+    async def add(self, doc_id: str, title: str, index, chunks: List[dict]) -> Document:
+        """Persist a new document and make it the current one."""
+        # Serialising the index and chunks is blocking I/O; keep it off the event loop
+        await asyncio.to_thread(self._write_files, doc_id, index, chunks)
+        
+        self._manifest["documents"][doc_id] = {"title": title, "chunks_count": len(chunks)}
+        self._manifest["current"] = doc_id
+        self._write_manifest()
+        
+        # The GPU clone and BM25 build block too
+        document = await asyncio.to_thread(Document, doc_id, title, index, chunks)
+        self._remember(document)
+        return document
+    
+    def search(self, query_embeddings: np.ndarray, documents: List[Document], top_k: int):
+        """Search one or more documents for a batch of queries in a single call.
+        
+        Returns one best-first list of chunks per query row.
+        """
+        ntotal = sum(document.index.ntotal for document in documents)
+        k = min(top_k, ntotal)
+        if k <= 0:
+            return [[] for _ in range(len(query_embeddings))]
+        
+        if len(documents) == 1:
+            index = documents[0].search_index
+        else:
+            # successive_ids offsets each shard's labels by the sizes of the shards before it
+            index = faiss.IndexShards(query_embeddings.shape[1], False, True)
+            for document in documents:
+                index.add_shard(document.search_index)
+        
+        if any(document.on_gpu for document in documents):
+            # Batches are dispatched concurrently, so GPU searches must take turns
+            with _gpu_lock:
+                distances, indices = index.search(query_embeddings, k)
+        else:
+            distances, indices = index.search(query_embeddings, k)
+        
+        # FAISS pads missing neighbours with -1; drop them without a per-element branch
+        if len(documents) == 1:
+            chunks = documents[0].chunks
+            return [[chunks[i] for i in row[row >= 0].tolist()] for row in indices]
+        
+        offsets = np.cumsum([0] + [document.index.ntotal for document in documents])
+        results = []
+        for row in indices:
+            labels = row[row >= 0]
+            shards = np.searchsorted(offsets, labels, side="right") - 1
+            local = labels - offsets[shards]
+            results.append([
+                documents[shard].chunks[i]
+                for shard, i in zip(shards.tolist(), local.tolist())
+            ])
+        
+        return results
+
+document_store = DocumentStore(DOCUMENTS_DIR)
+
+# ==================== QUERY BATCHING ====================
+class MicroBatcher:
+    """Coalesces concurrent requests into batches handled by a single call.
+    
+    `process_batch` is an async callable mapping a list of items to a list of
+    results in the same order.
+    """
+    
+    def __init__(self, process_batch, max_batch_size: int = QUERY_BATCH_MAX_SIZE, max_wait: float = QUERY_BATCH_MAX_WAIT):
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._loop = None
+        self._queue = None
+        self._worker = None
+        # The event loop only keeps weak references to tasks; hold in-flight dispatches here
+        self._tasks = set()
+    
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Queues and tasks are bound to a loop; (re)start on the running one
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._collect())
+        
+        future = loop.create_future()
+        self._queue.put_nowait((item, future))
+        return await future
+    
+    async def _collect(self):
+        while True:
+            batch = [await self._queue.get()]
+            deadline = self._loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Dispatch without waiting so the next batch can start collecting
+            task = self._loop.create_task(self._dispatch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+    
+    async def _dispatch(self, batch):
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("dispatching batch of %d to %s", len(batch), self.process_batch.__name__)
+        try:
+            results = await self.process_batch([item for item, _ in batch])
+        except Exception as e:
+            if len(batch) > 1:
+                # Retry items one at a time so a single bad item only fails its own caller
+                logger.warning("batch of %d failed (%s), retrying items individually", len(batch), e)
+                await asyncio.gather(*(self._dispatch([entry]) for entry in batch))
+                return
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+async def embed_queries(texts: List[str]):
+    """Embed a batch of queries (cache-aware) as unit-length rows."""
+    embeddings = await embed_cache.get_or_compute_many(texts, EMBEDDING_MODEL, embed_texts)
+    faiss.normalize_L2(embeddings)
+    return list(embeddings)
 
-def retrieve_chunks(query: str, index, chunks: List[dict], top_k: int = 5):
-    """Retrieve top-k relevant chunks from FAISS index."""
-    query_embedding = get_embedding(query)
-    distances, indices = index.search(query_embedding, min(top_k, len(chunks)))
+async def search_queries(requests: List[tuple]):
+    """Run batched searches for (documents, embedding, top_k) requests, one call per document set."""
+    groups = {}
+    for row, (documents, _, _) in enumerate(requests):
+        # Group by instance so every hit is a chunk object owned by the caller's documents
+        groups.setdefault(tuple(id(document) for document in documents), []).append(row)
     
-    results = []
-    for idx in indices[0]:
-        if idx < len(chunks):
-            results.append(chunks[idx])
+    results = [None] * len(requests)
+    for rows in groups.values():
+        documents = requests[rows[0]][0]
+        query_embeddings = np.vstack([requests[row][1] for row in rows])
+        top_k = max(requests[row][2] for row in rows)
+        hits = await asyncio.to_thread(document_store.search, query_embeddings, documents, top_k)
+        for row, row_hits in zip(rows, hits):
+            results[row] = row_hits[:requests[row][2]]
     
     return results
 
-def generate_answer(query: str, retrieved_chunks: List[dict]):
-    """Generate answer using GPT-3.5-turbo based on retrieved context."""
+embedding_batcher = MicroBatcher(embed_queries)
+search_batcher = MicroBatcher(search_queries)
+
+# ==================== RAG FUNCTIONS ====================
+async def get_embedding(text: str):
+    """Get the unit-length embedding for a single text query, batched with concurrent queries."""
+    embedding = await embedding_batcher.submit(text)
+    return embedding.reshape(1, -1)
+
+def build_index(embeddings: np.ndarray):
+    """Build a cosine-similarity FAISS index sized to the corpus."""
+    faiss.normalize_L2(embeddings)
+    dimension = embeddings.shape[1]
+    
+    # Small and mid-sized corpora store int8 scalar-quantized vectors: 4x less memory traffic per scan
+    if len(embeddings) <= FLAT_MAX_CHUNKS:
+        index = faiss.IndexScalarQuantizer(dimension, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT)
+    elif len(embeddings) < IVFPQ_MIN_CHUNKS:
+        index = faiss.IndexHNSWSQ(dimension, faiss.ScalarQuantizer.QT_8bit, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+    else:
+        index = faiss.index_factory(dimension, IVFPQ_FACTORY, faiss.METRIC_INNER_PRODUCT)
+        faiss.extract_index_ivf(index).nprobe = NPROBE
+    
+    index.train(embeddings)
+    index.add(embeddings)
+    return index
+
+def lexical_search(query: str, documents: List[Document], top_k: int):
+    """BM25 search across documents, returning chunks best-first."""
+    query_terms = bm25_terms(query)
+    hits = [
+        (score, document.chunks[idx])
+        for document in documents
+        for idx, score in document.bm25.search(query_terms, top_k)
+    ]
+    hits.sort(key=lambda hit: hit[0], reverse=True)
+    return [chunk for _, chunk in hits[:top_k]]
+
+def reciprocal_rank_fusion(rankings: List[List[dict]], top_k: int, k: int = RRF_K):
+    """Fuse best-first chunk rankings by summing 1 / (k + rank)."""
+    scores = {}
+    chunks_by_id = {}
+    for ranking in rankings:
+        for rank, chunk in enumerate(ranking):
+            scores[id(chunk)] = scores.get(id(chunk), 0.0) + 1.0 / (k + rank + 1)
+            chunks_by_id[id(chunk)] = chunk
+    
+    fused = sorted(scores, key=scores.get, reverse=True)
+    return [chunks_by_id[chunk_id] for chunk_id in fused[:top_k]]
+
+async def retrieve_chunks(query: str, documents: List[Document], top_k: int = 5):
+    """Retrieve top-k relevant chunks across the given documents with hybrid dense + BM25 search."""
+    candidates = top_k * RETRIEVAL_CANDIDATES_FACTOR
+    
+    # Embedding the query (a network call) and the lexical search are independent
+    query_embedding, lexical_hits = await asyncio.gather(
+        get_embedding(query),
+        asyncio.to_thread(lexical_search, query, documents, candidates)
+    )
+    dense_hits = await search_batcher.submit((documents, query_embedding, candidates))
+    
+    return reciprocal_rank_fusion([dense_hits, lexical_hits], top_k)
+
+def build_prompt(query: str, retrieved_chunks: List[dict]):
+    """Build the grounded answer prompt from retrieved context."""
     context = "\n\n".join([
         f"[{chunk['doc_title']} - Chunk {chunk['chunk_id']}]\n{chunk['text']}" 
         for chunk in retrieved_chunks
     ])
     
-    prompt = f"""You are a helpful assistant that answers questions based ONLY on the provided context.
+    return f"""You are a helpful assistant that answers questions based ONLY on the provided context.
 
 Context:
 {context}
@@ -133,97 +855,206 @@ Instructions:
 - Keep responses under 100 words.
 
 Answer:"""
+
+async def generate_answer(query: str, retrieved_chunks: List[dict]):
+    """Generate answer using GPT-3.5-turbo based on retrieved context."""
+    prompt = build_prompt(query, retrieved_chunks)
     
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.3,
-        max_tokens=200
+    response = await call_openai(
+        lambda: aclient.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.3,
+            max_tokens=ANSWER_MAX_TOKENS
+        ),
+        tokens=estimate_tokens(prompt) + ANSWER_MAX_TOKENS
     )
     
     return response.choices[0].message.content
 
+async def stream_answer(query: str, retrieved_chunks: List[dict]):
+    """Stream the answer from GPT-3.5-turbo, yielding one complete sentence at a time."""
+    prompt = build_prompt(query, retrieved_chunks)
+    
+    stream = await call_openai(
+        lambda: aclient.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.3,
+            max_tokens=ANSWER_MAX_TOKENS,
+            stream=True
+        ),
+        tokens=estimate_tokens(prompt) + ANSWER_MAX_TOKENS
+    )
+    
+    buffer = ""
+    async for event in stream:
+        if not event.choices or not event.choices[0].delta.content:
+            continue
+        buffer += event.choices[0].delta.content
+        *sentences, buffer = SENTENCE_BOUNDARY.split(buffer)
+        for sentence in sentences:
+            yield sentence
+    
+    if buffer.strip():
+        yield buffer.strip()
+
+def split_sentences(text: str):
+    """Split text into sentences for incremental TTS."""
+    return [sentence for sentence in SENTENCE_BOUNDARY.split(text.strip()) if sentence]
+
 # ==================== API ENDPOINTS ====================
+@app.on_event("startup")
+async def open_deepgram_client():
+    """Create one pooled HTTP/2 client for Deepgram so TTS calls reuse warm connections."""
+    deepgram_key = os.getenv("DEEPGRAM_API_KEY")
+    app.state.deepgram = httpx.AsyncClient(
+        base_url="https://api.deepgram.com",
+        http2=True,
+        timeout=httpx.Timeout(60.0, connect=5.0),
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+        headers={"Authorization": f"Token {deepgram_key}"} if deepgram_key else None
+    )
+
+@app.on_event("shutdown")
+async def close_deepgram_client():
+    await app.state.deepgram.aclose()
+
+@app.on_event("startup")
+async def restore_documents():
+    """Restore persisted documents so restarts don't force a re-upload."""
+    try:
+        document_store.load_manifest()
+        if document_store.current_id is not None:
+            document = await document_store.get(document_store.current_id)
+            logger.info("restored %s with %d vectors", document.title, document.index.ntotal)
+    except Exception as e:
+        logger.warning("could not restore saved documents: %s", e)
+
+def validate_query(query: str):
+    """Reject queries the embedding model can't accept before they join a shared batch."""
+    if not query.strip():
+        raise HTTPException(status_code=400, detail="Query must not be empty.")
+    if len(_ENCODING.encode_ordinary(query)) > QUERY_MAX_TOKENS:
+        raise HTTPException(status_code=400, detail=f"Query is too long (max {QUERY_MAX_TOKENS} tokens).")
+
+async def resolve_documents(doc_ids: Optional[List[str]]) -> List[Document]:
+    """Look up the documents a query targets, defaulting to the current one."""
+    if not doc_ids:
+        if document_store.current_id is None:
+            logger.warning("no document loaded")
+            raise HTTPException(status_code=400, detail="No document loaded. Please upload a document first.")
+        doc_ids = [document_store.current_id]
+    
+    unknown = [doc_id for doc_id in doc_ids if doc_id not in document_store]
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Unknown document ids: {', '.join(unknown)}")
+    
+    return [await document_store.get(doc_id) for doc_id in dict.fromkeys(doc_ids)]
+
 @app.get("/")
 async def root():
     return {"message": "Voice RAG API is running"}
 
 @app.get("/health")
 async def health_check():
+    current = document_store.current_id
+    info = document_store.list_documents()
+    current_info = next((doc for doc in info if doc["doc_id"] == current), None)
+    
     return {
         "status": "healthy",
-        "document_loaded": faiss_index is not None,
-        "chunks_count": len(chunks),
-        "document_title": doc_title
+        "document_loaded": current_info is not None,
+        "chunks_count": current_info["chunks_count"] if current_info else 0,
+        "document_title": current_info["title"] if current_info else "",
+        "doc_id": current,
+        "documents": info
     }
 
 @app.post("/upload-document")
 async def upload_document(file: UploadFile = File(...)):
     """Upload and process a text document."""
-    global faiss_index, chunks, doc_title
-    
     try:
-        print(f"\n📄 Processing document: {file.filename}")
+        logger.info("processing document: %s", file.filename)
+        
+        # Hash the document in shards so it is never buffered whole
+        doc_id = await hash_upload(file)
         
-        # Read document
-        content = await file.read()
-        text = content.decode('utf-8')
+        # Identical content was already processed; just switch to it
+        if doc_id in document_store:
+            document = await document_store.get(doc_id)
+            document_store.set_current(doc_id)
+            logger.info("reusing processed document %s (%s)", document.title, doc_id[:12])
+            return {
+                "status": "success",
+                "doc_id": doc_id,
+                "document_title": document.title,
+                "chunks_count": len(document.chunks),
+                "message": f"Successfully processed {document.title}"
+            }
+        
+        # Decode and tokenize incrementally
+        tokens, n_chars = await tokenize_upload(file)
         doc_title = file.filename.replace('.txt', '')
         
-        print(f"📖 Document length: {len(text)} characters")
+        logger.info("document length: %d characters", n_chars)
         
         # Chunk the text
-        chunks = chunk_text(text, doc_title)
-        print(f"✂️  Created {len(chunks)} chunks")
+        chunks = chunk_tokens(tokens, doc_title)
+        logger.info("created %d chunks", len(chunks))
+        
+        # FAISS can't train an index on zero vectors; report it instead of an internal assertion
+        if not any(chunk["text"].strip() for chunk in chunks):
+            raise HTTPException(status_code=400, detail="Document contains no text")
         
         # Create embeddings
-        embeddings = create_embeddings(chunks)
-        print(f"🔢 Generated embeddings: {embeddings.shape}")
+        embeddings = await create_embeddings(chunks)
+        logger.info("generated embeddings: %s", embeddings.shape)
         
-        # Create FAISS index
-        dimension = embeddings.shape[1]
-        faiss_index = faiss.IndexFlatL2(dimension)
-        faiss_index.add(embeddings)
+        # Create FAISS index and persist it so the document survives restarts
+        index = await asyncio.to_thread(build_index, embeddings)
+        await document_store.add(doc_id, doc_title, index, chunks)
         
-        print(f"✅ FAISS index created with {faiss_index.ntotal} vectors")
+        logger.info("faiss index created with %d vectors", index.ntotal)
         
         return {
             "status": "success",
+            "doc_id": doc_id,
             "document_title": doc_title,
             "chunks_count": len(chunks),
             "message": f"Successfully processed {doc_title}"
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"❌ Error processing document: {str(e)}")
+        logger.error("error processing document: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/query", response_model=QueryResponse)
 async def query_document(request: QueryRequest):
     """Query the document using RAG."""
-    global faiss_index, chunks
     
-    print(f"\n🔍 Received query: {request.query}")
+    logger.info("received query: %s", request.query)
     
-    if faiss_index is None or not chunks:
-        print("❌ No document loaded")
-        raise HTTPException(status_code=400, detail="No document loaded. Please upload a document first.")
+    validate_query(request.query)
+    documents = await resolve_documents(request.doc_ids)
     
     try:
         # Retrieve relevant chunks
-        retrieved = retrieve_chunks(request.query, faiss_index, chunks, request.top_k)
-        print(f"📚 Retrieved {len(retrieved)} chunks")
+        retrieved = await retrieve_chunks(request.query, documents, request.top_k)
+        logger.info("retrieved %d chunks", len(retrieved))
         
         if not retrieved:
-            print("⚠️  No relevant chunks found")
+            logger.warning("no relevant chunks found")
             return QueryResponse(
                 answer="I cannot find relevant information in the document.",
                 retrieved_chunks=[]
             )
         
         # Generate answer
-        answer = generate_answer(request.query, retrieved)
-        print(f"💬 Generated answer: {answer[:100]}...")
+        answer = await generate_answer(request.query, retrieved)
+        logger.debug("generated answer: %.100s...", answer)
         
         return QueryResponse(
             answer=answer,
@@ -231,9 +1062,56 @@ async def query_document(request: QueryRequest):
         )
     
     except Exception as e:
-        print(f"❌ Query error: {str(e)}")
+        logger.error("query error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/query-stream")
+async def query_document_stream(request: QueryRequest):
+    """Query the document using RAG, streaming the answer as server-sent events."""
+    
+    logger.info("received streaming query: %s", request.query)
+    
+    validate_query(request.query)
+    documents = await resolve_documents(request.doc_ids)
+    
+    try:
+        retrieved = await retrieve_chunks(request.query, documents, request.top_k)
+        logger.info("retrieved %d chunks", len(retrieved))
+    except Exception as e:
+        logger.error("query error: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    def sse(payload: dict):
+        return f"data: {json.dumps(payload)}\n\n"
+    
+    async def events():
+        if not retrieved:
+            logger.warning("no relevant chunks found")
+            answer = "I cannot find relevant information in the document."
+            yield sse({"type": "sentence", "text": answer})
+            yield sse({"type": "done", "answer": answer, "retrieved_chunks": []})
+            return
+        
+        sentences = []
+        try:
+            async for sentence in stream_answer(request.query, retrieved):
+                sentences.append(sentence)
+                yield sse({"type": "sentence", "text": sentence})
+        except Exception as e:
+            logger.error("streaming query error: %s", e)
+            yield sse({"type": "error", "detail": str(e)})
+            return
+        
+        answer = " ".join(sentences)
+        logger.debug("streamed answer: %.100s...", answer)
+        yield sse({"type": "done", "answer": answer, "retrieved_chunks": retrieved})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
+
 @app.get("/api-keys")
 async def get_api_keys():
     """Return API keys for frontend (Deepgram only)."""
@@ -264,51 +1142,121 @@ async def text_to_speech(request: TTSRequest):
     
     while retry_count <= max_retries:
         try:
-            print(f"🗣️  TTS request for text: {request.text[:50]}... (attempt {retry_count + 1}/{max_retries + 1})")
+            logger.info("tts request for text: %.50s... (attempt %d/%d)", request.text, retry_count + 1, max_retries + 1)
+            
+            url = f"/v1/speak?model={request.model}&encoding=linear16&container=wav"
+            
+            response = await app.state.deepgram.post(
+                url,
+                headers={"Content-Type": "application/json"},
+                json={"text": request.text}
+            )
             
-            url = f"https://api.deepgram.com/v1/speak?model={request.model}&encoding=linear16&container=wav"
+            if response.status_code != 200:
+                logger.error("deepgram tts error: %d - %s", response.status_code, response.text)
+                raise HTTPException(status_code=response.status_code, detail=f"Deepgram TTS error: {response.text}")
+            logger.info("tts audio generated: %d bytes", len(response.content))
             
-            # Increase timeout to 60 seconds for longer text
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                response = await client.post(
-                    url,
-                    headers={
-                        "Authorization": f"Token {deepgram_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json={"text": request.text}
-                )
-                
-                if response.status_code != 200:
-                    print(f"❌ Deepgram TTS error: {response.status_code} - {response.text}")
-                    raise HTTPException(status_code=response.status_code, detail=f"Deepgram TTS error: {response.text}")
-                print(f"📤 Sent TTS request to Deepgram, awaiting response... ", response)
-                print(f"✅ TTS audio generated: {len(response.content)} bytes")
-                
-                return Response(
-                    content=response.content,
-                    media_type="audio/wav",
-                    headers={
-                        "Content-Disposition": "inline; filename=speech.wav"
-                    }
-                )
+            return Response(
+                content=response.content,
+                media_type="audio/wav",
+                headers={
+                    "Content-Disposition": "inline; filename=speech.wav"
+                }
+            )
         
         except httpx.TimeoutException:
             retry_count += 1
             if retry_count > max_retries:
-                print(f"❌ TTS request timed out after {max_retries + 1} attempts")
+                logger.error("tts request timed out after %d attempts", max_retries + 1)
                 raise HTTPException(status_code=504, detail="TTS request timed out after multiple attempts")
-            print(f"⚠️  TTS timeout, retrying... ({retry_count}/{max_retries})")
+            logger.warning("tts timeout, retrying... (%d/%d)", retry_count, max_retries)
             await asyncio.sleep(1)  # Wait 1 second before retry
         
         except httpx.HTTPStatusError as e:
-            print(f"❌ HTTP error: {e.response.status_code}")
+            logger.error("http error: %d", e.response.status_code)
             raise HTTPException(status_code=e.response.status_code, detail=str(e))
         
         except Exception as e:
-            print(f"❌ TTS error: {str(e)}")
+            logger.error("tts error: %s", e)
             raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/tts-stream")
+async def text_to_speech_stream(request: TTSRequest):
+    """Proxy TTS to Deepgram sentence by sentence, streaming MP3 audio as it arrives."""
+    deepgram_key = os.getenv("DEEPGRAM_API_KEY")
+    
+    if not deepgram_key:
+        raise HTTPException(status_code=500, detail="Deepgram API key not found")
+    
+    sentences = split_sentences(request.text)
+    if not sentences:
+        raise HTTPException(status_code=400, detail="No text to synthesize")
+    
+    logger.info("streaming tts for %d sentences: %.50s...", len(sentences), request.text)
+    
+    # MP3 frames concatenate cleanly, unlike one WAV header per sentence
+    url = f"/v1/speak?model={request.model}&encoding=mp3"
+    
+    async def open_speech(sentence: str) -> httpx.Response:
+        tts_request = app.state.deepgram.build_request(
+            "POST",
+            url,
+            headers={"Content-Type": "application/json"},
+            json={"text": sentence}
+        )
+        response = await app.state.deepgram.send(tts_request, stream=True)
+        if response.status_code != 200:
+            await response.aread()
+            await response.aclose()
+            logger.error("deepgram tts error: %d - %s", response.status_code, response.text)
+            raise HTTPException(status_code=response.status_code, detail=f"Deepgram TTS error: {response.text}")
+        return response
+    
+    # Open the first sentence before responding so Deepgram failures still become HTTP errors
+    try:
+        first = await open_speech(sentences[0])
+    except httpx.TimeoutException:
+        logger.error("tts stream request timed out")
+        raise HTTPException(status_code=504, detail="TTS request timed out")
+    except httpx.HTTPError as e:
+        logger.error("tts stream error: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    async def audio():
+        response = first
+        next_response = None
+        try:
+            for position in range(len(sentences)):
+                if position + 1 < len(sentences):
+                    # Open the next sentence now so its time to first byte overlaps this one's audio
+                    next_response = asyncio.create_task(open_speech(sentences[position + 1]))
+                try:
+                    async for data in response.aiter_bytes():
+                        yield data
+                finally:
+                    await response.aclose()
+                if next_response is not None:
+                    response = await next_response
+                    next_response = None
+        except HTTPException:
+            # Already logged; the status line is sent, so just end the audio early
+            return
+        except httpx.HTTPError as e:
+            logger.error("tts stream error: %s", e)
+            return
+        finally:
+            # Release a request opened ahead when the stream ends early
+            if next_response is not None:
+                if not next_response.done():
+                    next_response.cancel()
+                elif not next_response.cancelled() and next_response.exception() is None:
+                    await next_response.result().aclose()
+        logger.info("streamed tts audio for %d sentences", len(sentences))
+    
+    # The background task releases the first response if the body is never iterated
+    return StreamingResponse(audio(), media_type="audio/mpeg", background=BackgroundTask(first.aclose))
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# main.py builds its clients and caches at import time
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("VOICE_RAG_DATA_DIR", tempfile.mkdtemp(prefix="voice_rag_test_"))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,28 @@
+import main
+
+CHUNKS = [
+    "Bananas are a tropical fruit. A ripe banana is yellow and sweet.",
+    "Paris is the capital of France, and the Eiffel Tower stands in Paris.",
+    "The mitochondria is the powerhouse of the cell.",
+]
+
+
+def search(query, top_k=3):
+    index = main.BM25Index([main.bm25_terms(text) for text in CHUNKS])
+    return [idx for idx, _ in index.search(main.bm25_terms(query), top_k)]
+
+
+def test_bm25_terms_casefold_and_drop_stopwords_and_punctuation():
+    assert main.bm25_terms("What is the Capital of FRANCE?") == ["capital", "france"]
+
+
+def test_single_word_queries_match_their_chunk():
+    assert search("fruit") == [0]
+    assert search("bananas") == [0]
+    assert search("Paris") == [1]
+    assert search("paris") == [1]
+
+
+def test_function_words_do_not_match_unrelated_chunks():
+    assert search("What is the capital?") == [1]
+    assert search("what is it?") == []
@@ -0,0 +1,25 @@
+import asyncio
+
+import main
+
+
+def test_failing_item_only_fails_its_own_caller():
+    calls = []
+    
+    async def process_batch(items):
+        calls.append(list(items))
+        if "bad" in items:
+            raise ValueError("bad item")
+        return [item.upper() for item in items]
+    
+    async def run():
+        batcher = main.MicroBatcher(process_batch, max_wait=0.05)
+        return await asyncio.gather(
+            batcher.submit("good"), batcher.submit("bad"), batcher.submit("fine"),
+            return_exceptions=True
+        )
+    
+    good, bad, fine = asyncio.run(run())
+    assert (good, fine) == ("GOOD", "FINE")
+    assert isinstance(bad, ValueError)
+    assert calls[0] == ["good", "bad", "fine"]
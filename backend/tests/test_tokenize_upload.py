@@ -0,0 +1,87 @@
+import asyncio
+import io
+import random
+
+import pytest
+import regex
+from fastapi import UploadFile
+
+import main
+
+# Characters that exercise every branch of the cl100k_base split pattern,
+# plus multi-byte UTF-8 so shards cut through code points
+ALPHABET = list("ab xyZ  \n\n\t\r.,!?-'s0123éß€中文字😀") + ["  ", "\r\n", " \n", "'ll", "'S", "\n "]
+
+
+def random_text(rng: random.Random, max_len: int = 120) -> str:
+    return "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, max_len)))
+
+
+def tokenize(text: str):
+    upload = UploadFile(file=io.BytesIO(text.encode("utf-8")), filename="doc.txt")
+    return asyncio.run(main.tokenize_upload(upload))
+
+
+@pytest.mark.parametrize("read_size", [1, 3, 7, 64])
+def test_tokenize_upload_matches_whole_text_encode(monkeypatch, read_size):
+    monkeypatch.setattr(main, "UPLOAD_READ_SIZE", read_size)
+    rng = random.Random(read_size)
+    for _ in range(400):
+        text = random_text(rng)
+        tokens, n_chars = tokenize(text)
+        assert tokens == main._ENCODING.encode(text), repr(text)
+        assert n_chars == len(text)
+
+
+def test_pretoken_boundary_never_splits_a_pretoken():
+    pattern = regex.compile(main._ENCODING._pat_str)
+    rng = random.Random(0)
+    for _ in range(2000):
+        text = random_text(rng)
+        start = rng.randint(0, len(text))
+        splits = main._line_boundaries(text, start)
+        split = main._pretoken_boundary(text, start)
+        if split:
+            splits.append(split)
+        for split in splits:
+            assert split >= start
+            assert pattern.findall(text[:split]) + pattern.findall(text[split:]) == pattern.findall(text), repr(text)
+
+
+class RecordingEncoding:
+    """Wraps the real encoding, recording the text of every segment it encodes."""
+    
+    def __init__(self):
+        self.encoded = []
+    
+    def encode(self, text):
+        self.encoded.append(text)
+        return main._ENCODING.encode(text)
+
+
+def test_text_without_boundaries_is_flushed(monkeypatch):
+    encoding = RecordingEncoding()
+    monkeypatch.setattr(main, "token_cache", main.TokenCache(encoding, min_chars=1_000_000))
+    monkeypatch.setattr(main, "UPLOAD_READ_SIZE", 16)
+    monkeypatch.setattr(main, "UPLOAD_MAX_PENDING_CHARS", 32)
+    text = "中文字" * 100
+    tokens, n_chars = tokenize(text)
+    
+    assert len(encoding.encoded) > 1
+    assert max(len(segment) for segment in encoding.encoded) <= 32 + 16
+    assert main._ENCODING.decode(tokens) == text
+    assert n_chars == len(text)
+
+
+def test_repeated_lines_hit_the_token_cache(monkeypatch):
+    encoding = RecordingEncoding()
+    monkeypatch.setattr(main, "token_cache", main.TokenCache(encoding, min_chars=1))
+    monkeypatch.setattr(main, "UPLOAD_READ_SIZE", 64)
+    boilerplate = "Copyright (c) Example Corp. All rights reserved.\nLicensed under the MIT License.\n"
+    first = boilerplate + "First document body.\n"
+    second = "Second document, different length.\n" + boilerplate
+    
+    assert tokenize(first)[0] == main._ENCODING.encode(first)
+    encoding.encoded.clear()
+    assert tokenize(second)[0] == main._ENCODING.encode(second)
+    assert not any("Copyright" in segment or "Licensed" in segment for segment in encoding.encoded)
@@ -411,22 +411,11 @@ function App() {
     setError('');
 
     try {
-      // Query the RAG system
-      console.log('🔍 Querying RAG system...');
-      const queryRes = await axios.post(`${API_URL}/query`, {
-        query: currentTranscript,
-        top_k: 5
-      });
-
-      const answer = queryRes.data.answer;
+      // Stream the answer from the RAG system and speak it sentence by sentence
+      console.log('🔍 Querying RAG system (streaming)...');
+      const answer = await streamAndSpeakAnswer(currentTranscript);
       console.log('💬 Received answer:', answer);
 
-      // Convert response to speech using Deepgram TTS.
-      // We delay showing the textual answer until audio playback actually begins
-      // so the text and voice are synchronized.
-      console.log('🗣️  Converting to speech... (will display text when audio starts)');
-      await speakResponse(answer, currentTranscript);
-
       // In continuous mode: Clear transcript buffer and prepare for next question
       console.log('🔄 Clearing transcript buffer - ready for next question');
       transcriptBufferRef.current = '';
@@ -453,83 +442,132 @@ function App() {
     }
   };
 
-  // Text-to-Speech using backend proxy to Deepgram Aura
-  // speakResponse now accepts the text and the original question and will
-  // display the textual answer at the moment audio playback begins so both
-  // text and voice appear in sync.
-  const speakResponse = async (text, question) => {
-    try {
-  setIsSpeaking(true);
-  isSpeakingRef.current = true;
-      console.log('🗣️  Generating speech via backend...');
-
-      // Use backend TTS endpoint to avoid CORS issues
-      const response = await axios.post(`${API_URL}/tts`, {
-        text: text,
-        model: 'aura-asteria-en'
-      }, {
-        responseType: 'blob', // Important: receive as blob
-        timeout: 60000 // allow up to 60s for TTS generation/transfer
-      });
+  // Text-to-Speech for a single sentence using the backend proxy to Deepgram Aura
+  const fetchSentenceAudio = async (sentence) => {
+    // Use backend TTS endpoint to avoid CORS issues
+    const response = await axios.post(`${API_URL}/tts-stream`, {
+      text: sentence,
+      model: 'aura-asteria-en'
+    }, {
+      responseType: 'blob', // Important: receive as blob
+      timeout: 60000 // allow up to 60s for TTS generation/transfer
+    });
+    return new Blob([response.data], { type: 'audio/mpeg' });
+  };
 
-      // Create audio blob and play
-      const audioBlob = new Blob([response.data], { type: 'audio/wav' });
-      const audioUrl = URL.createObjectURL(audioBlob);
-      const audio = new Audio(audioUrl);
-
-      // When playback actually starts, show the textual response and add to history
-      const onPlayHandler = () => {
-        console.log('▶️  Audio playback started - syncing text display');
-        setResponse(text);
-        setChatHistory(prev => [...prev, {
-          question: question,
-          answer: text,
-          timestamp: new Date().toLocaleTimeString()
-        }]);
-        // remove this handler after it fires
-        audio.removeEventListener('play', onPlayHandler);
-      };
+  // Play an audio blob, resolving once playback ends (or fails)
+  const playAudioBlob = (audioBlob) => new Promise((resolve) => {
+    const audioUrl = URL.createObjectURL(audioBlob);
+    const audio = new Audio(audioUrl);
+    const finish = () => {
+      URL.revokeObjectURL(audioUrl); // Clean up blob URL
+      resolve();
+    };
+    audio.onended = finish;
+    audio.onerror = (err) => {
+      console.error('❌ Audio playback error:', err);
+      finish();
+    };
+    audio.play().catch((err) => {
+      console.error('❌ Audio playback error:', err);
+      finish();
+    });
+  });
+
+  // Read the /query-stream SSE response and speak each sentence as soon as it
+  // arrives. Audio for later sentences is fetched while earlier ones play, and
+  // each sentence's text is shown when its audio starts so text and voice stay
+  // in sync. Resolves with the full answer once the stream is done; playback
+  // of the queued sentences may still be running.
+  const streamAndSpeakAnswer = async (question) => {
+    const res = await fetch(`${API_URL}/query-stream`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ query: question, top_k: 5 })
+    });
+    if (!res.ok) {
+      const body = await res.json().catch(() => ({}));
+      throw new Error(body.detail || `Query failed with status ${res.status}`);
+    }
 
-      audio.addEventListener('play', onPlayHandler);
+    setResponse('');
+    setIsSpeaking(true);
+    isSpeakingRef.current = true;
+
+    let playback = Promise.resolve();
+    let spokenText = '';
+    let ttsFailed = false;
+
+    const speakSentence = (sentence) => {
+      // Start fetching right away; playback waits for the previous sentence
+      const audioPromise = fetchSentenceAudio(sentence).catch((err) => {
+        console.error('❌ TTS error:', err);
+        ttsFailed = true;
+        return null;
+      });
+      playback = playback.then(async () => {
+        const audioBlob = await audioPromise;
+        spokenText = spokenText ? `${spokenText} ${sentence}` : sentence;
+        setResponse(spokenText);
+        if (audioBlob) {
+          console.log('▶️  Playing sentence:', sentence);
+          await playAudioBlob(audioBlob);
+        }
+      });
+    };
 
-      audio.onended = () => {
-        setIsSpeaking(false);
-        isSpeakingRef.current = false;
-        URL.revokeObjectURL(audioUrl); // Clean up blob URL
-        console.log('✅ Audio playback completed');
-      };
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let answer = '';
 
-      audio.onerror = (err) => {
+    try {
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        // SSE events are separated by a blank line
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+          const rawEvent = buffer.slice(0, boundary);
+          buffer = buffer.slice(boundary + 2);
+          const data = rawEvent
+            .split('\n')
+            .filter(line => line.startsWith('data: '))
+            .map(line => line.slice(6))
+            .join('\n');
+          if (!data) continue;
+
+          const event = JSON.parse(data);
+          if (event.type === 'sentence') {
+            speakSentence(event.text);
+          } else if (event.type === 'done') {
+            answer = event.answer;
+          } else if (event.type === 'error') {
+            throw new Error(event.detail);
+          }
+        }
+      }
+    } finally {
+      // Stay in speaking mode until every queued sentence has played
+      playback.then(() => {
         setIsSpeaking(false);
         isSpeakingRef.current = false;
-        console.error('❌ Audio playback error:', err);
-        setError('Failed to play audio response');
-        // Fallback: ensure the text is shown even if audio playback fails
-        setResponse(text);
-        setChatHistory(prev => [...prev, {
-          question: question,
-          answer: text,
-          timestamp: new Date().toLocaleTimeString()
-        }]);
-      };
-
-      // Start playback - await ensures we know when playback begins (or rejects)
-      await audio.play();
-      console.log('▶️  Playing audio response');
-
-    } catch (err) {
-      console.error('❌ TTS error:', err);
-      setError('Failed to generate speech: ' + (err?.response?.data?.detail || err?.message || 'Unknown error'));
-  setIsSpeaking(false);
-  isSpeakingRef.current = false;
-      // Fallback: display the text answer immediately if TTS failed
-      setResponse(text);
-      setChatHistory(prev => [...prev, {
-        question: question,
-        answer: text,
-        timestamp: new Date().toLocaleTimeString()
-      }]);
+        if (ttsFailed) {
+          setError('Failed to generate speech for part of the response');
+        }
+        console.log('✅ Audio playback completed');
+      });
     }
+
+    setChatHistory(prev => [...prev, {
+      question: question,
+      answer: answer,
+      timestamp: new Date().toLocaleTimeString()
+    }]);
+    playback.then(() => setResponse(answer));
+    return answer;
   };
 
   // Reset document